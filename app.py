@@ -5,20 +5,26 @@ Guides users through creating videos step-by-step with xAI.
 """
 
 import logging
+import math
 import os
+import shutil
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify
-from werkzeug.utils import secure_filename
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote
+from flask import Flask, abort, g, render_template, request, redirect, url_for, flash, send_file, jsonify
 import requests
-from PIL import Image
-import base64
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import PIL
+from PIL import Image, ImageOps
 import io
 
 from config import Config
 from prompt_generator import generate_clip_plan
-from video_processor import extract_last_frame, strip_audio, concat_videos
-from session_manager import SessionManager
+from video_processor import process_clip, concat_videos
+from session_manager import SessionData, SessionManager
 
 # Setup logging
 logging.basicConfig(
@@ -28,8 +34,12 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
-# Generate a secret key if not provided (for production, set FLASK_SECRET_KEY env var)
-app.secret_key = os.environ.get("FLASK_SECRET_KEY") or os.urandom(32).hex()
+
+# Reject request bodies above 2 GB before they are read
+app.config['MAX_CONTENT_LENGTH'] = 2 * 1024 ** 3
+
+# Behind a front-end server with X-Sendfile support, let it stream files from disk instead of Python
+app.config['USE_X_SENDFILE'] = bool(os.environ.get("FLASK_USE_X_SENDFILE"))
 
 # Security: Ensure cookies are only sent over HTTPS in production
 if not os.environ.get("FLASK_DEBUG"):
@@ -48,42 +58,104 @@ try:
 except Exception as e:
     logger.info(f"No config.yaml found or error loading it: {e}. Users will provide their own API keys.")
 
+# Pillow-SIMD reports a ".postN" version; log it to confirm which build is active
+logger.info(f"Using Pillow {PIL.__version__}")
+
 # Session and upload directories
 UPLOAD_FOLDER = Path("uploads")
 SESSIONS_DIR = Path("sessions")
 UPLOAD_FOLDER.mkdir(exist_ok=True)
 SESSIONS_DIR.mkdir(exist_ok=True)
 
-ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'mov', 'avi'}
-ALLOWED_IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+
+def load_secret_key(key_file: Path) -> bytes:
+    """Read the persisted secret key, generating it on first start."""
+    if key_file.exists():
+        return key_file.read_bytes()
+    
+    # Write to a temp file and hard-link it into place, so concurrent starts agree on one key
+    key = os.urandom(32)
+    tmp_file = key_file.with_name(f"{key_file.name}.{os.getpid()}.tmp")
+    # Create it 0600 from the start so the key is never readable by others, even briefly
+    tmp_file.unlink(missing_ok=True)  # leftover from a crashed start with the same pid
+    with os.fdopen(os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as f:
+        f.write(key)
+    try:
+        os.link(tmp_file, key_file)
+    except FileExistsError:
+        key = key_file.read_bytes()
+    finally:
+        tmp_file.unlink()
+    return key
+
+
+# Use FLASK_SECRET_KEY if set; otherwise a key persisted on disk so signed cookies survive restarts
+app.secret_key = os.environ.get("FLASK_SECRET_KEY") or load_secret_key(SESSIONS_DIR / ".secret_key")
+
+DOWNLOAD_CHUNK_SIZE = 512 * 1024  # bytes per read/write when downloading images
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # bytes per read/write when saving uploaded videos
+MAX_IMAGE_SIZE = (1920, 1920)  # bounding box for stored starting images
+THUMBNAIL_SIZE = (800, 800)  # bounding box for on-page previews (fits the page container)
+IMAGE_CACHE_MAX_AGE = 3600  # seconds browsers may reuse a served step image
+
+ALLOWED_VIDEO_SUFFIXES = ('.mp4', '.mov', '.avi')
+ALLOWED_IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png')
 
 session_manager = SessionManager(SESSIONS_DIR)
 
+# Background pool for ffmpeg post-processing of uploaded videos, keyed by (session_id, step_num).
+# Jobs are dropped as soon as they finish; only the outcome (None on success, else the error
+# message) is kept until the step page or upload_status reports it.
+processing_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='video-processing')
+processing_jobs: Dict[Tuple[str, int], Future] = {}
+processing_results: Dict[Tuple[str, int], Optional[str]] = {}
+_NO_RESULT = object()
+
+# Shared HTTP session so repeated image downloads reuse pooled keep-alive connections
+HTTP_SESSION = requests.Session()
+_http_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.3),
+)
+HTTP_SESSION.mount('https://', _http_adapter)
+HTTP_SESSION.mount('http://', _http_adapter)
+
 
-def allowed_file(filename: str, extensions: set) -> bool:
+def allowed_file(filename: str, suffixes: Tuple[str, ...]) -> bool:
     """Check if file extension is allowed."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in extensions
+    return filename.lower().endswith(suffixes)
+
+
+def fitted_size(size: Tuple[int, int], box: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    Size of an image scaled down (never up) to fit in box, keeping its aspect ratio.
+    
+    Pass this, not the box itself, to Image.draft: draft picks its scale so the result still
+    covers the requested size, so a square box would keep e.g. a 4:3 photo at full size.
+    """
+    width, height = size
+    scale = min(box[0] / width, box[1] / height, 1)
+    return math.ceil(width * scale), math.ceil(height * scale)
 
 
 def save_starting_image(file, session_id: str) -> Path:
-    """Save uploaded starting image."""
+    """Save uploaded starting image as a JPEG that fits within MAX_IMAGE_SIZE."""
     session_dir = UPLOAD_FOLDER / session_id
     session_dir.mkdir(exist_ok=True)
     
-    filename = secure_filename(file.filename)
-    image_path = session_dir / f"starting_image.{filename.rsplit('.', 1)[1].lower()}"
-    file.save(str(image_path))
+    # Decode straight from the upload stream; only the normalized JPEG is written to disk
+    jpeg_path = session_dir / "starting_image.jpg"
+    with Image.open(file.stream) as src:
+        if src.format == 'JPEG':
+            # Let libjpeg scale down while decoding instead of decoding full resolution
+            src.draft('RGB', fitted_size(src.size, MAX_IMAGE_SIZE))
+        # Apply the EXIF orientation now, since the metadata is dropped on save
+        img = ImageOps.exif_transpose(src).convert('RGB')
+    img.thumbnail(MAX_IMAGE_SIZE, Image.Resampling.BILINEAR)
+    img.save(jpeg_path, 'JPEG', quality=85, optimize=True, progressive=True, exif=b'')
     
-    # Convert to JPEG if needed
-    if image_path.suffix.lower() != '.jpg':
-        with Image.open(image_path) as img:
-            jpeg_path = session_dir / "starting_image.jpg"
-            img.convert('RGB').save(jpeg_path, 'JPEG', quality=95)
-            if image_path != jpeg_path:
-                image_path.unlink()
-            return jpeg_path
-    
-    return image_path
+    return jpeg_path
 
 
 def download_image_from_url(url: str, session_id: str) -> Path:
@@ -91,27 +163,139 @@ def download_image_from_url(url: str, session_id: str) -> Path:
     session_dir = UPLOAD_FOLDER / session_id
     session_dir.mkdir(exist_ok=True)
     
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    
     image_path = session_dir / "starting_image.jpg"
-    with image_path.open("wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                f.write(chunk)
+    with HTTP_SESSION.get(url, stream=True, timeout=(5, 30)) as response:
+        response.raise_for_status()
+        # Copy the raw socket stream in large blocks (decoding gzip/deflate if sent)
+        response.raw.decode_content = True
+        with image_path.open("wb") as f:
+            shutil.copyfileobj(response.raw, f, length=DOWNLOAD_CHUNK_SIZE)
     
     return image_path
 
 
-def image_to_data_url(image_path: Path) -> str:
-    """Convert image to data URL for easy copying."""
-    with open(image_path, "rb") as f:
-        img_data = f.read()
-        base64_data = base64.b64encode(img_data).decode('utf-8')
-        ext = image_path.suffix.lower().lstrip('.')
-        if ext == 'jpg':
-            ext = 'jpeg'
-        return f"data:image/{ext};base64,{base64_data}"
+def load_session(session_id: str) -> Optional[SessionData]:
+    """Get session data, memoized on flask.g so each request loads a session at most once."""
+    cache = g.setdefault('session_cache', {})
+    if session_id not in cache:
+        cache[session_id] = session_manager.get_session(session_id)
+    return cache[session_id]
+
+
+def thumbnail_path(image_path: Path) -> Path:
+    """Path of the preview thumbnail stored next to an image."""
+    return image_path.with_name(f"{image_path.stem}_thumb.jpg")
+
+
+def save_thumbnail(image_path: Path) -> Path:
+    """Write a small preview JPEG next to an image, so pages never load the full-size file."""
+    with Image.open(image_path) as src:
+        if src.format == 'JPEG':
+            src.draft('RGB', fitted_size(src.size, THUMBNAIL_SIZE))
+        img = src.convert('RGB')
+    img.thumbnail(THUMBNAIL_SIZE, Image.Resampling.BILINEAR)
+    
+    thumb_path = thumbnail_path(image_path)
+    img.save(thumb_path, 'JPEG', quality=80, optimize=True)
+    return thumb_path
+
+
+def image_url_for(session_id: str, step_num: int, image_path: Path, thumbnail: bool = False) -> str:
+    """URL of a step image, versioned by mtime so re-uploaded frames bypass the browser cache."""
+    if thumbnail and thumbnail_path(image_path).exists():
+        image_path = thumbnail_path(image_path)
+    return url_for('get_image', session_id=session_id, step_num=step_num, thumbnail=thumbnail,
+                   v=image_path.stat().st_mtime_ns)
+
+
+def process_uploaded_video(session_id: str, step_num: int, video_path: Path) -> None:
+    """Strip audio, extract the last frame and record the video in the session (runs in background)."""
+    try:
+        session_dir = video_path.parent
+        
+        # Strip audio and extract last frame
+        silent_video_path = session_dir / f"step_{step_num}_silent.mp4"
+        frame_path = session_dir / f"step_{step_num}_frame.jpg"
+        process_clip(video_path, silent_video_path, frame_path)
+        save_thumbnail(frame_path)
+        
+        # Update session
+        session_manager.add_uploaded_video(
+            session_id,
+            str(silent_video_path),
+            str(frame_path)
+        )
+    except Exception as e:
+        logger.error(f"Error processing video for session {session_id} step {step_num}: {e}")
+        raise
+
+
+def save_and_process_video(stream, session_id: str, step_num: int, size: Optional[int] = None) -> None:
+    """Write an uploaded video stream to the session folder and queue it for processing."""
+    session_dir = UPLOAD_FOLDER / session_id
+    session_dir.mkdir(exist_ok=True)
+    
+    # Save uploaded video
+    video_path = session_dir / f"step_{step_num}.mp4"
+    # The silent copy may be a hardlink to a previous upload; write a fresh file rather than truncating it
+    video_path.unlink(missing_ok=True)
+    with video_path.open('wb') as out:
+        if size and hasattr(os, 'posix_fallocate'):
+            # Reserve the whole file up front: one extent allocation, and a full disk fails before streaming
+            os.posix_fallocate(out.fileno(), 0, size)
+        shutil.copyfileobj(stream, out, length=UPLOAD_CHUNK_SIZE)
+        out.truncate()
+    
+    # Process in the background; the step page polls upload_status until done
+    key = (session_id, step_num)
+    processing_results.pop(key, None)
+    job = processing_executor.submit(process_uploaded_video, session_id, step_num, video_path)
+    processing_jobs[key] = job
+    job.add_done_callback(lambda done: finish_processing_job(key, done))
+
+
+def finish_processing_job(key: Tuple[str, int], job: Future) -> None:
+    """Forget a finished job, keeping only its outcome until it is reported."""
+    error = job.exception()
+    processing_results[key] = None if error is None else str(error)
+    # Record the outcome before dropping the job, so "not processing" always has a result to show
+    if processing_jobs.get(key) is job:
+        del processing_jobs[key]
+
+
+def is_processing(session_id: str, step_num: int) -> bool:
+    """Check if an uploaded video for this step is still being processed."""
+    return (session_id, step_num) in processing_jobs
+
+
+def take_processing_result(session_id: str, step_num: int) -> Tuple[bool, Optional[str]]:
+    """
+    Pop the unreported outcome of the last upload for a step.
+    
+    Returns:
+        (finished, error): finished is False if there is nothing to report; error is the
+        failure message, or None if processing succeeded
+    """
+    result = processing_results.pop((session_id, step_num), _NO_RESULT)
+    if result is _NO_RESULT:
+        return False, None
+    return True, result
+
+
+def next_step_url(session: SessionData, step_num: int) -> str:
+    """URL of the step after step_num, or of the combine page after the last one."""
+    if step_num < len(session.prompts):
+        return url_for('step', session_id=session.session_id, step_num=step_num + 1)
+    return url_for('combine', session_id=session.session_id)
+
+
+@app.errorhandler(413)
+def request_entity_too_large(error):
+    """Handle uploads larger than MAX_CONTENT_LENGTH."""
+    flash('File is too large (maximum 2 GB)', 'error')
+    if request.method == 'PUT':
+        return jsonify({'redirect': request.referrer or url_for('index')}), 413
+    return redirect(request.referrer or url_for('index'))
 
 
 @app.route('/')
@@ -164,7 +348,7 @@ def create():
         # Handle image upload or URL
         if 'starting_image_file' in request.files:
             file = request.files['starting_image_file']
-            if file and file.filename and allowed_file(file.filename, ALLOWED_IMAGE_EXTENSIONS):
+            if file and file.filename and allowed_file(file.filename, ALLOWED_IMAGE_SUFFIXES):
                 starting_image_path = save_starting_image(file, session_id)
         elif request.form.get('starting_image_url'):
             image_url = request.form.get('starting_image_url', '').strip()
@@ -179,6 +363,8 @@ def create():
                 session_file.unlink()
             return redirect(url_for('index'))
         
+        save_thumbnail(starting_image_path)
+        
         # Update session with correct image path
         session_manager.update_session(session_id, starting_image_path=str(starting_image_path))
         
@@ -193,24 +379,29 @@ def create():
 @app.route('/plan/<session_id>')
 def plan(session_id: str):
     """Display all prompts and starting image."""
-    session = session_manager.get_session(session_id)
+    session = load_session(session_id)
     if not session:
         flash('Session not found', 'error')
         return redirect(url_for('index'))
     
     starting_image_path = Path(session.starting_image_path)
-    image_data_url = image_to_data_url(starting_image_path) if starting_image_path.exists() else None
+    image_url = None
+    thumbnail_url = None
+    if starting_image_path.exists():
+        image_url = image_url_for(session_id, 1, starting_image_path)
+        thumbnail_url = image_url_for(session_id, 1, starting_image_path, thumbnail=True)
     
     return render_template('plan.html', 
                          session=session,
                          starting_image_path=starting_image_path,
-                         image_data_url=image_data_url)
+                         image_url=image_url,
+                         thumbnail_url=thumbnail_url)
 
 
 @app.route('/step/<session_id>/<int:step_num>')
 def step(session_id: str, step_num: int):
     """Show current step with image and prompt to copy."""
-    session = session_manager.get_session(session_id)
+    session = load_session(session_id)
     if not session:
         flash('Session not found', 'error')
         return redirect(url_for('index'))
@@ -219,6 +410,13 @@ def step(session_id: str, step_num: int):
         flash('Invalid step number', 'error')
         return redirect(url_for('plan', session_id=session_id))
     
+    # An upload for this step may have finished before the browser got here
+    finished, error = take_processing_result(session_id, step_num)
+    if error is not None:
+        flash(f'Error processing video: {error}', 'error')
+    elif finished:
+        return redirect(next_step_url(session, step_num))
+    
     # Get image for this step
     if step_num == 1:
         image_path = Path(session.starting_image_path)
@@ -235,7 +433,8 @@ def step(session_id: str, step_num: int):
         return redirect(url_for('plan', session_id=session_id))
     
     prompt = session.prompts[step_num - 1]
-    image_data_url = image_to_data_url(image_path)
+    image_url = image_url_for(session_id, step_num, image_path)
+    thumbnail_url = image_url_for(session_id, step_num, image_path, thumbnail=True)
     
     is_complete = len(session.uploaded_videos) >= step_num
     
@@ -244,14 +443,16 @@ def step(session_id: str, step_num: int):
                          step_num=step_num,
                          prompt=prompt,
                          image_path=image_path,
-                         image_data_url=image_data_url,
-                         is_complete=is_complete)
+                         image_url=image_url,
+                         thumbnail_url=thumbnail_url,
+                         is_complete=is_complete,
+                         is_processing=is_processing(session_id, step_num))
 
 
 @app.route('/upload/<session_id>/<int:step_num>', methods=['POST'])
 def upload(session_id: str, step_num: int):
     """Handle video upload for a step."""
-    session = session_manager.get_session(session_id)
+    session = load_session(session_id)
     if not session:
         flash('Session not found', 'error')
         return redirect(url_for('index'))
@@ -265,50 +466,89 @@ def upload(session_id: str, step_num: int):
         flash('No video file selected', 'error')
         return redirect(url_for('step', session_id=session_id, step_num=step_num))
     
-    if not allowed_file(file.filename, ALLOWED_VIDEO_EXTENSIONS):
+    if not allowed_file(file.filename, ALLOWED_VIDEO_SUFFIXES):
         flash('Invalid file type. Please upload MP4, MOV, or AVI.', 'error')
         return redirect(url_for('step', session_id=session_id, step_num=step_num))
     
+    if is_processing(session_id, step_num):
+        flash('The previous upload for this step is still being processed', 'error')
+        return redirect(url_for('step', session_id=session_id, step_num=step_num))
+    
     try:
-        session_dir = UPLOAD_FOLDER / session_id
-        session_dir.mkdir(exist_ok=True)
-        
-        # Save uploaded video
-        video_filename = f"step_{step_num}.mp4"
-        video_path = session_dir / video_filename
-        file.save(str(video_path))
-        
-        # Strip audio
-        silent_video_path = session_dir / f"step_{step_num}_silent.mp4"
-        strip_audio(video_path, silent_video_path)
-        
-        # Extract last frame
-        frame_path = session_dir / f"step_{step_num}_frame.jpg"
-        extract_last_frame(silent_video_path, frame_path)
-        
-        # Update session
-        session_manager.add_uploaded_video(
-            session_id,
-            str(silent_video_path),
-            str(frame_path)
-        )
-        
-        # Move to next step or show combine page
-        if step_num < len(session.prompts):
-            return redirect(url_for('step', session_id=session_id, step_num=step_num + 1))
-        else:
-            return redirect(url_for('combine', session_id=session_id))
+        save_and_process_video(file.stream, session_id, step_num)
+        return redirect(url_for('step', session_id=session_id, step_num=step_num))
             
     except Exception as e:
         logger.error(f"Error uploading video: {e}")
-        flash(f'Error processing video: {str(e)}', 'error')
+        flash(f'Error uploading video: {str(e)}', 'error')
         return redirect(url_for('step', session_id=session_id, step_num=step_num))
 
 
+@app.route('/upload/<session_id>/<int:step_num>', methods=['PUT'])
+def upload_direct(session_id: str, step_num: int):
+    """Handle a video sent by the browser as the raw request body (no multipart encoding)."""
+    step_url = url_for('step', session_id=session_id, step_num=step_num)
+    
+    session = load_session(session_id)
+    if not session:
+        flash('Session not found', 'error')
+        return jsonify({'redirect': url_for('index')}), 404
+    
+    filename = unquote(request.headers.get('X-Filename', ''))
+    if not filename or not request.content_length:
+        flash('No video file selected', 'error')
+        return jsonify({'redirect': step_url}), 400
+    
+    if request.content_length > app.config['MAX_CONTENT_LENGTH']:
+        abort(413)
+    
+    if not allowed_file(filename, ALLOWED_VIDEO_SUFFIXES):
+        flash('Invalid file type. Please upload MP4, MOV, or AVI.', 'error')
+        return jsonify({'redirect': step_url}), 400
+    
+    if is_processing(session_id, step_num):
+        flash('The previous upload for this step is still being processed', 'error')
+        return jsonify({'redirect': step_url}), 409
+    
+    try:
+        save_and_process_video(request.stream, session_id, step_num, size=request.content_length)
+        return jsonify({'redirect': step_url})
+    
+    except Exception as e:
+        logger.error(f"Error uploading video: {e}")
+        flash(f'Error uploading video: {str(e)}', 'error')
+        return jsonify({'redirect': step_url}), 500
+
+
+@app.route('/status/<session_id>/<int:step_num>')
+def upload_status(session_id: str, step_num: int):
+    """Report whether the uploaded video for a step has finished processing."""
+    session = load_session(session_id)
+    if not session:
+        return jsonify({'status': 'not_found'}), 404
+    
+    if is_processing(session_id, step_num):
+        return jsonify({'status': 'processing'})
+    
+    finished, error = take_processing_result(session_id, step_num)
+    if error is not None:
+        flash(f'Error processing video: {error}', 'error')
+        return jsonify({
+            'status': 'failed',
+            'redirect': url_for('step', session_id=session_id, step_num=step_num),
+        })
+    
+    if not finished and len(session.uploaded_videos) < step_num:
+        return jsonify({'status': 'not_uploaded'})
+    
+    # Move to next step or show combine page
+    return jsonify({'status': 'done', 'redirect': next_step_url(session, step_num)})
+
+
 @app.route('/combine/<session_id>')
 def combine(session_id: str):
     """Final step: combine all videos."""
-    session = session_manager.get_session(session_id)
+    session = load_session(session_id)
     if not session:
         flash('Session not found', 'error')
         return redirect(url_for('index'))
@@ -330,7 +570,7 @@ def combine(session_id: str):
 @app.route('/combine/<session_id>/generate', methods=['POST'])
 def generate_final(session_id: str):
     """Generate final combined video."""
-    session = session_manager.get_session(session_id)
+    session = load_session(session_id)
     if not session:
         flash('Session not found', 'error')
         return redirect(url_for('index'))
@@ -367,7 +607,7 @@ def generate_final(session_id: str):
 @app.route('/download/<session_id>')
 def download(session_id: str):
     """Download the final combined video."""
-    session = session_manager.get_session(session_id)
+    session = load_session(session_id)
     if not session:
         flash('Session not found', 'error')
         return redirect(url_for('index'))
@@ -379,13 +619,19 @@ def download(session_id: str):
         flash('Final video not found. Please generate it first.', 'error')
         return redirect(url_for('combine', session_id=session_id))
     
-    return send_file(str(final_output), as_attachment=True, download_name='final_output.mp4')
+    # Conditional responses honour Range, so interrupted downloads resume instead of restarting.
+    # The file is handed to the server's wsgi.file_wrapper, which gunicorn serves with sendfile(2).
+    response = send_file(str(final_output), mimetype='video/mp4', as_attachment=True,
+                         download_name='final_output.mp4', conditional=True, etag=True)
+    response.cache_control.private = True
+    return response
 
 
-@app.route('/image/<session_id>/<int:step_num>')
-def get_image(session_id: str, step_num: int):
-    """Serve image file for download."""
-    session = session_manager.get_session(session_id)
+@app.route('/image/<session_id>/<int:step_num>', defaults={'thumbnail': False})
+@app.route('/image/<session_id>/<int:step_num>/thumb', defaults={'thumbnail': True})
+def get_image(session_id: str, step_num: int, thumbnail: bool):
+    """Serve image file for download, or its preview thumbnail."""
+    session = load_session(session_id)
     if not session:
         return "Session not found", 404
     
@@ -400,7 +646,15 @@ def get_image(session_id: str, step_num: int):
     if not image_path.exists():
         return "Image not found", 404
     
-    return send_file(str(image_path), mimetype='image/jpeg')
+    if thumbnail and thumbnail_path(image_path).exists():
+        image_path = thumbnail_path(image_path)
+    
+    # Page URLs carry an mtime version (see image_url_for), so the browser may reuse its copy
+    response = send_file(str(image_path), mimetype='image/jpeg', conditional=True, etag=True,
+                         max_age=IMAGE_CACHE_MAX_AGE)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
 
 
 if __name__ == '__main__':
@@ -15,8 +15,8 @@ from typing import List
 from config import Config
 from supabase_manager import upload_image_to_supabase, upload_frame_to_supabase
 from prompt_generator import generate_clip_plan
-from video_generator import call_generate_video_api, poll_video_status, download_video_from_sora
-from video_processor import strip_audio, extract_last_frame, concat_videos
+from video_generator import generate_and_download
+from video_processor import process_clip, concat_videos
 
 
 # =============================
@@ -83,28 +83,19 @@ def main():
         logger.info("=" * 60)
 
         try:
-            # Generate video (returns video ID)
-            video_id = call_generate_video_api(
+            # Generate video, wait for completion and download it from the Sora API
+            raw_clip_path = generate_and_download(
                 config=config,
                 prompt=prompt,
                 image_url=current_image_url,
+                output_path=config.output_dir / f"clip_{i:02d}.mp4",
             )
 
-            # Poll for completion
-            status_data = poll_video_status(config, video_id)
-
-            # Download video directly from Sora API using download endpoint
-            raw_clip_path = config.output_dir / f"clip_{i:02d}.mp4"
-            download_video_from_sora(config, video_id, raw_clip_path)
-
-            # Process: strip audio
+            # Process: strip audio and extract last frame
             silent_clip_path = config.output_dir / f"clip_{i:02d}_silent.mp4"
-            strip_audio(raw_clip_path, silent_clip_path)
-            silent_clips.append(silent_clip_path)
-
-            # Extract last frame
             last_frame_path = config.output_dir / f"clip_{i:02d}_last_frame.jpg"
-            extract_last_frame(silent_clip_path, last_frame_path)
+            process_clip(raw_clip_path, silent_clip_path, last_frame_path)
+            silent_clips.append(silent_clip_path)
 
             # Auto-chain frames if enabled: use last frame as next clip's starting image
             if config.auto_chain_frames and i < config.num_clips:
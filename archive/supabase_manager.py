@@ -1,9 +1,57 @@
 import logging
+import os
 from pathlib import Path
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Files at or above this size go through Supabase's S3-compatible endpoint as parallel multipart uploads
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+MULTIPART_CONCURRENCY = 8
+
+_client = None
+
+
+def _get_client(config: Config):
+    """Return the shared Supabase client, creating it on first use so its HTTP connections are reused."""
+    global _client
+    if _client is None:
+        from supabase import ClientOptions, create_client
+        
+        _client = create_client(
+            config.supabase_url,
+            config.supabase_key,
+            options=ClientOptions(postgrest_client_timeout=30),
+        )
+    return _client
+
+
+def _upload_multipart(config: Config, image_path: Path, filename: str) -> None:
+    """
+    Upload a large file to Supabase Storage via its S3 endpoint using parallel multipart upload.
+    
+    Requires SUPABASE_S3_ACCESS_KEY_ID and SUPABASE_S3_SECRET_ACCESS_KEY
+    (Supabase project settings → Storage → S3 access keys).
+    """
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    
+    s3 = boto3.client(
+        "s3",
+        endpoint_url=f"{config.supabase_url.rstrip('/')}/storage/v1/s3",
+        aws_access_key_id=os.environ["SUPABASE_S3_ACCESS_KEY_ID"],
+        aws_secret_access_key=os.environ["SUPABASE_S3_SECRET_ACCESS_KEY"],
+        region_name=os.environ.get("SUPABASE_S3_REGION", "us-east-1"),
+    )
+    transfer_config = TransferConfig(
+        multipart_threshold=MULTIPART_THRESHOLD,
+        multipart_chunksize=MULTIPART_CHUNKSIZE,
+        max_concurrency=MULTIPART_CONCURRENCY,
+        use_threads=True,
+    )
+    s3.upload_file(str(image_path), config.supabase_bucket, filename, Config=transfer_config)
+
 
 def upload_image_to_supabase(config: Config, image_path: Path, filename: str) -> str:
     """
@@ -20,18 +68,25 @@ def upload_image_to_supabase(config: Config, image_path: Path, filename: str) ->
     Raises:
         RuntimeError: If upload fails due to permissions or other errors
     """
-    from supabase import create_client
-    
     logger.info(f"Uploading image to Supabase: {image_path.name}")
     
     if not image_path.exists():
         raise RuntimeError(f"Image file not found: {image_path}")
     
-    supabase = create_client(config.supabase_url, config.supabase_key)
+    supabase = _get_client(config)
+    
+    use_multipart = (
+        image_path.stat().st_size >= MULTIPART_THRESHOLD
+        and os.environ.get("SUPABASE_S3_ACCESS_KEY_ID")
+        and os.environ.get("SUPABASE_S3_SECRET_ACCESS_KEY")
+    )
     
     try:
-        with image_path.open("rb") as f:
-            supabase.storage.from_(config.supabase_bucket).upload(filename, f, {"upsert": "true"})
+        if use_multipart:
+            _upload_multipart(config, image_path, filename)
+        else:
+            with image_path.open("rb") as f:
+                supabase.storage.from_(config.supabase_bucket).upload(filename, f, {"upsert": "true"})
     except Exception as e:
         error_msg = str(e)
         if "row-level security" in error_msg.lower() or "403" in error_msg or "unauthorized" in error_msg.lower():
@@ -50,36 +105,48 @@ def upload_image_to_supabase(config: Config, image_path: Path, filename: str) ->
     return public_url
 
 
-def download_image_from_supabase(config: Config, filename: str, output_path: Path) -> None:
+def read_image_from_supabase(config: Config, filename: str) -> bytes:
     """
-    Download an image file from Supabase Storage using authenticated client.
+    Download an image file from Supabase Storage into memory using authenticated client.
     
     Args:
         config: Configuration object with Supabase credentials
         filename: Filename in storage
-        output_path: Local path to save the downloaded image
+    
+    Returns:
+        The file contents
     
     Raises:
         RuntimeError: If download fails
     """
-    from supabase import create_client
-    
     logger.debug(f"Downloading image from Supabase: {filename}")
     
-    supabase = create_client(config.supabase_url, config.supabase_key)
+    supabase = _get_client(config)
     
     try:
         # Download file using authenticated client
-        file_data = supabase.storage.from_(config.supabase_bucket).download(filename)
-        
-        with output_path.open("wb") as f:
-            f.write(file_data)
-        
-        logger.debug(f"Downloaded image to: {output_path}")
+        return supabase.storage.from_(config.supabase_bucket).download(filename)
     except Exception as e:
         raise RuntimeError(f"Failed to download image from Supabase: {e}") from e
 
 
+def download_image_from_supabase(config: Config, filename: str, output_path: Path) -> None:
+    """
+    Download an image file from Supabase Storage using authenticated client.
+    
+    Args:
+        config: Configuration object with Supabase credentials
+        filename: Filename in storage
+        output_path: Local path to save the downloaded image
+    
+    Raises:
+        RuntimeError: If download fails
+    """
+    file_data = read_image_from_supabase(config, filename)
+    output_path.write_bytes(file_data)
+    logger.debug(f"Downloaded image to: {output_path}")
+
+
 def upload_frame_to_supabase(config: Config, frame_path: Path, clip_number: int) -> str:
     """
     Upload extracted frame to Supabase Storage and return public URL.
@@ -1,41 +1,113 @@
+import io
 import logging
+import os
+import random
+import shutil
 import time
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional, Tuple, Union
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from PIL import Image
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Shared HTTP session: generate, poll and download calls to api.openai.com reuse one
+# keep-alive connection instead of a new TCP + TLS handshake per request
+_SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        raise_on_status=False,
+    ),
+)
+_SESSION.mount("https://", _adapter)
+_SESSION.mount("http://", _adapter)
 
-def resize_image_to_video_size(image_path: Path, video_size: str) -> None:
+# Status polling gets its own session: 429s and Retry-After are handled by poll_video_status,
+# which keeps every wait inside its deadline, so urllib3 must not retry or sleep on them first
+_POLL_SESSION = requests.Session()
+_POLL_SESSION.mount("https://", HTTPAdapter(
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    ),
+))
+
+POLL_TIMEOUT_SECONDS = 600  # give up on a video after 10 minutes
+MAX_POLL_INTERVAL_SECONDS = 30
+VIDEO_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _resize_for_video(img: Image.Image, video_size: Tuple[int, int]) -> Optional[Image.Image]:
+    """Return img resized to the video dimensions, or None if it already matches."""
+    width, height = video_size
+    
+    if img.size == (width, height):
+        logger.debug(f"Image already matches video size {width}x{height}")
+        return None
+    
+    logger.info(f"Resizing image from {img.size[0]}x{img.size[1]} to {width}x{height}")
+    if img.format == "JPEG":
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when the source is much larger than the target
+        img.draft("RGB", (width, height))
+    
+    # Close to the target size BILINEAR is visually identical and faster; otherwise use LANCZOS
+    ratio = max(img.size[0] / width, img.size[1] / height, width / img.size[0], height / img.size[1])
+    resample = Image.Resampling.BILINEAR if ratio < 1.5 else Image.Resampling.LANCZOS
+    return img.resize((width, height), resample)
+
+
+def _save_jpeg(img: Image.Image, fp: Union[Path, BinaryIO]) -> None:
+    """Save a Sora input image; quality 85 + optimize keeps the upload small at no visible cost."""
+    img.save(fp, "JPEG", quality=85, optimize=True, progressive=True, subsampling=2)
+
+
+def resize_image_to_video_size(image_path: Path, video_size: Tuple[int, int]) -> None:
     """
     Resize image to match the requested video dimensions.
     
     Args:
         image_path: Path to the image file (will be modified in place)
-        video_size: Video size string in format "WIDTHxHEIGHT" (e.g., "1280x720")
+        video_size: Video (width, height), e.g. config.video_size_wh
     """
-    width, height = map(int, video_size.split("x"))
-    
     with Image.open(image_path) as img:
-        current_size = img.size
-        
-        # Only resize if dimensions don't match
-        if current_size != (width, height):
-            logger.info(f"Resizing image from {current_size[0]}x{current_size[1]} to {width}x{height}")
-            # Use LANCZOS resampling for high quality
-            resized_img = img.resize((width, height), Image.Resampling.LANCZOS)
-            resized_img.save(image_path, "JPEG", quality=95)
-            logger.debug(f"Image resized successfully")
-        else:
-            logger.debug(f"Image already matches video size {width}x{height}")
+        resized_img = _resize_for_video(img, video_size)
+        if resized_img is not None:
+            _save_jpeg(resized_img, image_path)
+
+
+def _resize_bytes(buf: io.BytesIO, video_size: Tuple[int, int]) -> io.BytesIO:
+    """
+    Decode an in-memory image and return it resized to the video dimensions.
+    
+    Images that already match are returned as-is, without a decode/encode round trip.
+    """
+    with Image.open(buf) as img:
+        resized_img = _resize_for_video(img, video_size)
+    
+    if resized_img is None:
+        buf.seek(0)
+        return buf
+    
+    resized_buf = io.BytesIO()
+    _save_jpeg(resized_img, resized_buf)
+    resized_buf.seek(0)
+    return resized_buf
 
 
-def download_image_to_temp(image_url: str, temp_path: Path, config: Optional[Config] = None) -> None:
+def download_image(image_url: str, config: Optional[Config] = None) -> io.BytesIO:
     """
-    Download image from URL to temporary file for Sora upload.
+    Download image from URL into memory for Sora upload.
     
     If the URL is from Supabase Storage and config is provided, uses authenticated download.
     Otherwise, uses direct HTTP GET.
@@ -49,7 +121,7 @@ def download_image_to_temp(image_url: str, temp_path: Path, config: Optional[Con
         # URL format: https://project.supabase.co/storage/v1/object/public/bucket/filename
         # or: https://project.supabase.co/storage/v1/object/public/bucket/path/to/file.jpg
         try:
-            from supabase_manager import download_image_from_supabase
+            from supabase_manager import read_image_from_supabase
             
             # Extract bucket and filename from URL
             # Split URL to get the path after /public/
@@ -65,11 +137,9 @@ def download_image_to_temp(image_url: str, temp_path: Path, config: Optional[Con
                     # Verify bucket matches config
                     if bucket == config.supabase_bucket:
                         logger.debug(f"Using authenticated Supabase download for: {filename}")
-                        download_image_from_supabase(config, filename, temp_path)
+                        buf = io.BytesIO(read_image_from_supabase(config, filename))
                         # Resize to match video dimensions
-                        if config:
-                            resize_image_to_video_size(temp_path, config.video_size)
-                        return
+                        return _resize_bytes(buf, config.video_size_wh)
             
             # If we can't parse the URL, fall through to HTTP download
             logger.warning(f"Could not parse Supabase URL, falling back to HTTP: {image_url}")
@@ -77,17 +147,17 @@ def download_image_to_temp(image_url: str, temp_path: Path, config: Optional[Con
             logger.warning(f"Failed to use Supabase authenticated download, falling back to HTTP: {e}")
     
     # Fallback to direct HTTP download
-    response = requests.get(image_url, stream=True)
-    response.raise_for_status()
-    
-    with temp_path.open("wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                f.write(chunk)
+    buf = io.BytesIO()
+    with _SESSION.get(image_url, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        shutil.copyfileobj(response.raw, buf)
+    buf.seek(0)
     
     # Resize to match video dimensions after download
     if config:
-        resize_image_to_video_size(temp_path, config.video_size)
+        return _resize_bytes(buf, config.video_size_wh)
+    return buf
 
 
 def call_generate_video_api(
@@ -112,52 +182,65 @@ def call_generate_video_api(
 
     logger.info(f"Requesting video generation: {prompt!r}")
     
-    # Download image to temp file for multipart upload
-    temp_image = Path("/tmp/sora_image.jpg")
-    try:
-        download_image_to_temp(image_url, temp_image, config)
-        
-        # Prepare multipart form data
-        files = {
-            "input_reference": ("image.jpg", temp_image.open("rb"), "image/jpeg"),
-        }
-        data = {
-            "prompt": prompt,
-            "model": config.sora_model,
-            "size": config.video_size,
-            "seconds": config.clip_duration,
-        }
-        
-        response = requests.post(
-            config.generate_endpoint,
-            headers=headers,
-            files=files,
-            data=data,
-            timeout=60,
-        )
-        
-        if not response.ok:
-            raise RuntimeError(f"Sora request failed: {response.status_code} {response.text}")
+    # Download image into memory for multipart upload (never written to disk)
+    image_buf = download_image(image_url, config)
+    
+    # Prepare multipart form data
+    files = {
+        "input_reference": ("image.jpg", image_buf, "image/jpeg"),
+    }
+    data = {
+        "prompt": prompt,
+        "model": config.sora_model,
+        "size": config.video_size,
+        "seconds": config.clip_duration,
+    }
+    
+    response = _SESSION.post(
+        config.generate_endpoint,
+        headers=headers,
+        files=files,
+        data=data,
+        timeout=60,
+    )
+    
+    if not response.ok:
+        raise RuntimeError(f"Sora request failed: {response.status_code} {response.text}")
 
-        result = response.json()
-        
-        # Sora returns video ID, not URL yet (need to poll)
-        video_id = result.get("id")
-        if not video_id:
-            raise RuntimeError(f"No video ID in Sora response: {result}")
-        
-        logger.info(f"Video generation started, ID: {video_id}")
-        return video_id
-        
-    finally:
-        if temp_image.exists():
-            temp_image.unlink()
+    result = response.json()
+    
+    # Sora returns video ID, not URL yet (need to poll)
+    video_id = result.get("id")
+    if not video_id:
+        raise RuntimeError(f"No video ID in Sora response: {result}")
+    
+    logger.info(f"Video generation started, ID: {video_id}")
+    return video_id
+
+
+def _poll_delay(config: Config, attempt: int) -> float:
+    """Exponential backoff from poll_interval_seconds, capped and jittered by ±20%."""
+    delay = min(config.poll_interval_seconds * 2 ** attempt, MAX_POLL_INTERVAL_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Parse a Retry-After header given in seconds, if present."""
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
 
 
 def poll_video_status(config: Config, video_id: str) -> dict:
     """
     Poll OpenAI Sora API until video generation completes.
     
+    Waits between polls grow exponentially (with jitter) from
+    config.poll_interval_seconds up to MAX_POLL_INTERVAL_SECONDS.
+    Rate-limited (429) responses wait for the server's Retry-After; no wait
+    extends past the POLL_TIMEOUT_SECONDS deadline.
+    
     Args:
         config: Configuration
         video_id: Video ID returned from POST /videos
@@ -170,13 +253,21 @@ def poll_video_status(config: Config, video_id: str) -> dict:
         "Authorization": f"Bearer {config.api_key}",
     }
 
-    max_polls = 120  # Max 10 minutes (120 polls * 5 seconds)
-    poll_count = 0
+    deadline = time.monotonic() + POLL_TIMEOUT_SECONDS
+    attempt = 0
     
-    while poll_count < max_polls:
-        logger.info(f"Polling Sora video status (attempt {poll_count + 1}/{max_polls}): {video_id}")
+    while time.monotonic() < deadline:
+        logger.info(f"Polling Sora video status (attempt {attempt + 1}): {video_id}")
+        
+        response = _POLL_SESSION.get(poll_url, headers=headers, timeout=(5, 30))
         
-        response = requests.get(poll_url, headers=headers)
+        if response.status_code == 429:
+            delay = _retry_after_seconds(response) or _poll_delay(config, attempt)
+            delay = max(0.0, min(delay, deadline - time.monotonic()))
+            logger.warning(f"Rate limited while polling, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+            continue
         
         if not response.ok:
             raise RuntimeError(f"Status request failed: {response.status_code} {response.text}")
@@ -191,15 +282,13 @@ def poll_video_status(config: Config, video_id: str) -> dict:
             return data
         elif status == "failed":
             raise RuntimeError(f"Video generation failed: {data}")
-        elif status in ("pending", "processing"):
-            time.sleep(config.poll_interval_seconds)
-            poll_count += 1
-        else:
+        elif status not in ("pending", "processing"):
             logger.warning(f"Unknown status: {status}")
-            time.sleep(config.poll_interval_seconds)
-            poll_count += 1
+        
+        time.sleep(max(0.0, min(_poll_delay(config, attempt), deadline - time.monotonic())))
+        attempt += 1
     
-    raise RuntimeError(f"Video generation timeout after {max_polls * config.poll_interval_seconds} seconds")
+    raise RuntimeError(f"Video generation timeout after {POLL_TIMEOUT_SECONDS} seconds")
 
 
 def download_video_from_sora(config: Config, video_id: str, output_path: Path) -> None:
@@ -218,17 +307,42 @@ def download_video_from_sora(config: Config, video_id: str, output_path: Path) -
     
     logger.info(f"Downloading video from Sora: {video_id}")
     
-    response = requests.get(download_url, headers=headers, stream=True)
-    response.raise_for_status()
-    
-    with output_path.open("wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                f.write(chunk)
+    with _SESSION.get(download_url, headers=headers, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        size = int(response.headers.get("Content-Length") or 0)
+        # A silent copy from an earlier run may hardlink this path; write a new file, not into it
+        output_path.unlink(missing_ok=True)
+        with output_path.open("wb") as f:
+            if size and hasattr(os, "posix_fallocate"):
+                # Reserve the clip's extents up front instead of growing the file per write
+                os.posix_fallocate(f.fileno(), 0, size)
+            shutil.copyfileobj(response.raw, f, VIDEO_DOWNLOAD_CHUNK_SIZE)
+            f.truncate()
     
     logger.info(f"Downloaded {output_path.stat().st_size / (1024*1024):.2f} MB")
 
 
+def generate_and_download(
+    config: Config,
+    prompt: str,
+    image_url: Optional[str],
+    output_path: Path,
+) -> Path:
+    """
+    Generate one clip with Sora and download it once it is ready.
+    
+    Chains call_generate_video_api, poll_video_status and download_video_from_sora.
+    
+    Returns:
+        output_path, containing the downloaded video
+    """
+    video_id = call_generate_video_api(config=config, prompt=prompt, image_url=image_url)
+    poll_video_status(config, video_id)
+    download_video_from_sora(config, video_id, output_path)
+    return output_path
+
+
 def download_video(video_url: str, output_path) -> None:
     """
     Download the generated video file from a URL.
@@ -238,12 +352,12 @@ def download_video(video_url: str, output_path) -> None:
     """
     logger.info(f"Downloading video to {output_path.name}")
     
-    with requests.get(video_url, stream=True) as r:
+    with _SESSION.get(video_url, stream=True) as r:
         r.raise_for_status()
+        r.raw.decode_content = True
+        output_path.unlink(missing_ok=True)  # may be hardlinked by an earlier silent copy
         with output_path.open("wb") as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+            shutil.copyfileobj(r.raw, f, VIDEO_DOWNLOAD_CHUNK_SIZE)
     
     logger.info(f"Downloaded {output_path.stat().st_size / (1024*1024):.2f} MB")
 
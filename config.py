@@ -1,17 +1,25 @@
 import os
 import logging
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Tuple
 import yaml
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_VIDEO_SIZE = "1280x720"
+
 
 @dataclass
 class Config:
     """Configuration for video generation web app."""
     api_key: str  # OpenAI API key for prompt generation
     output_dir: Path
+    video_size: str = DEFAULT_VIDEO_SIZE  # Sora "WIDTHxHEIGHT" (only used by archive/)
+    video_size_wh: Tuple[int, int] = field(init=False)  # video_size parsed once, in __post_init__
+    
+    def __post_init__(self) -> None:
+        self.video_size_wh = parse_video_size(self.video_size)
     
     @classmethod
     def from_yaml(cls, config_file: Path) -> "Config":
@@ -33,8 +41,29 @@ class Config:
         # Output directory for uploads (defaults to uploads if not specified)
         output_dir = Path(data.get("output", {}).get("directory", "uploads"))
         
+        # Video size for Sora. The web app doesn't use it, so a bad value must not
+        # make loading fail; warn and fall back to the default instead.
+        video_size = str(data.get("generation", {}).get("video_size", DEFAULT_VIDEO_SIZE))
+        try:
+            parse_video_size(video_size)
+        except ValueError as e:
+            logger.warning(f"{e}; using {DEFAULT_VIDEO_SIZE}")
+            video_size = DEFAULT_VIDEO_SIZE
+        
         return cls(
             api_key=api_key,
             output_dir=output_dir,
+            video_size=video_size,
         )
 
+
+def parse_video_size(video_size: str) -> Tuple[int, int]:
+    """Parse a "WIDTHxHEIGHT" string into (width, height)."""
+    try:
+        width, height = (int(part) for part in video_size.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Invalid video_size {video_size!r}, expected WIDTHxHEIGHT (e.g. 1280x720)") from None
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Invalid video_size {video_size!r}, width and height must be positive")
+    return width, height
+
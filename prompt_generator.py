@@ -1,11 +1,27 @@
-import json
 import logging
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import List
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Shared HTTP session so OpenAI calls reuse pooled keep-alive connections.
+# Auth headers stay per call: each web-app user supplies their own API key.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        raise_on_status=False,
+    ),
+))
+
 
 def call_openai_gpt(api_key: str, scene_description: str, num_clips: int) -> List[str]:
     """
@@ -22,13 +38,13 @@ def call_openai_gpt(api_key: str, scene_description: str, num_clips: int) -> Lis
     system_prompt = (
         "You are a creative video scriptwriter. Your job is to break down a scene description "
         "into distinct, sequential video clips. Each clip should build on the previous one, "
-        "creating a coherent story progression. Return ONLY a JSON array of strings with no markdown."
+        "creating a coherent story progression."
     )
     
     user_message = (
         f"Break this scene into {num_clips} distinct, sequential video clip prompts. "
         f"Each prompt should be 1-2 sentences and build on the previous one. "
-        f"Return as a JSON array of exactly {num_clips} strings, nothing else.\n\n"
+        f'Return a JSON object of the form {{"prompts": [...]}} with exactly {num_clips} strings.\n\n'
         f"Scene: {scene_description}"
     )
     
@@ -39,10 +55,11 @@ def call_openai_gpt(api_key: str, scene_description: str, num_clips: int) -> Lis
         ],
         "model": "gpt-4o-mini",  # Fast, cheap model
         "temperature": 0.7,
+        "response_format": {"type": "json_object"},  # JSON mode: always a well-formed object
     }
     
     logger.info(f"Calling OpenAI GPT to plan {num_clips} clips")
-    response = requests.post(
+    response = _SESSION.post(
         "https://api.openai.com/v1/chat/completions",
         headers=headers,
         json=payload,
@@ -53,22 +70,14 @@ def call_openai_gpt(api_key: str, scene_description: str, num_clips: int) -> Lis
             f"OpenAI API request failed: {response.status_code} {response.text}"
         )
     
-    data = response.json()
+    data = orjson.loads(response.content)
     content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
     
     if not content:
         raise RuntimeError("No content from OpenAI API")
     
     try:
-        # Parse JSON from response (may have markdown fencing)
-        content_clean = content.strip()
-        if content_clean.startswith("```"):
-            content_clean = content_clean.split("```")[1]
-            if content_clean.startswith("json"):
-                content_clean = content_clean[4:]
-        content_clean = content_clean.strip()
-        
-        prompts = json.loads(content_clean)
+        prompts = orjson.loads(content).get("prompts")
         
         if not isinstance(prompts, list) or len(prompts) != num_clips:
             raise ValueError(f"Expected list of {num_clips} prompts, got {len(prompts) if isinstance(prompts, list) else 'not a list'}")
@@ -79,7 +88,7 @@ def call_openai_gpt(api_key: str, scene_description: str, num_clips: int) -> Lis
         
         return prompts
         
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         logger.error(f"Failed to parse OpenAI response as JSON: {content}")
         raise RuntimeError(f"OpenAI response was not valid JSON: {e}")
 
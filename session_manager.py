@@ -1,14 +1,16 @@
-import json
 import logging
+import os
 from pathlib import Path
 from typing import Dict, Optional, List
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 import uuid
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class SessionData:
     """Session data structure."""
     session_id: str
@@ -23,10 +25,9 @@ class SessionData:
     
     def to_dict(self) -> dict:
         """Convert to dictionary for JSON serialization."""
-        # Don't save API key to disk for security
-        data = asdict(self)
-        data.pop('openai_api_key', None)  # Remove API key before saving
-        return data
+        # Don't save API key to disk for security. Shallow on purpose: unlike asdict() it
+        # doesn't deep-copy the lists, which are serialized straight away.
+        return {name: getattr(self, name) for name in _PERSISTED_FIELDS}
     
     @classmethod
     def from_dict(cls, data: dict) -> "SessionData":
@@ -37,6 +38,9 @@ class SessionData:
         return cls(**data)
 
 
+_PERSISTED_FIELDS = tuple(f.name for f in fields(SessionData) if f.name != 'openai_api_key')
+
+
 class SessionManager:
     """Manages session state for the web app."""
     
@@ -44,6 +48,8 @@ class SessionManager:
         self.sessions_dir = sessions_dir
         self.sessions_dir.mkdir(exist_ok=True)
         self._in_memory_sessions: Dict[str, SessionData] = {}
+        # st_mtime_ns of each session file as of our last read/write of it
+        self._session_mtimes: Dict[str, int] = {}
     
     def create_session(
         self,
@@ -75,25 +81,35 @@ class SessionManager:
         return session_id
     
     def get_session(self, session_id: str) -> Optional[SessionData]:
-        """Get session data by ID."""
-        # Check in-memory first
-        if session_id in self._in_memory_sessions:
-            return self._in_memory_sessions[session_id]
+        """Get session data by ID.
         
-        # Try to load from file
+        The in-memory copy is reused as long as the session file's mtime is unchanged,
+        so the JSON is only parsed again if another process has rewritten it.
+        """
         session_file = self.sessions_dir / f"{session_id}.json"
-        if session_file.exists():
-            try:
-                with session_file.open("r", encoding="utf-8") as f:
-                    data = json.load(f)
-                session_data = SessionData.from_dict(data)
-                self._in_memory_sessions[session_id] = session_data
-                return session_data
-            except Exception as e:
-                logger.error(f"Failed to load session {session_id}: {e}")
-                return None
+        cached = self._in_memory_sessions.get(session_id)
+        try:
+            mtime = session_file.stat().st_mtime_ns
+        except OSError:
+            # Not on disk (yet); the in-memory copy, if any, is authoritative
+            return cached
         
-        return None
+        if cached is not None and self._session_mtimes.get(session_id) == mtime:
+            return cached
+        
+        try:
+            session_data = SessionData.from_dict(orjson.loads(session_file.read_bytes()))
+        except Exception as e:
+            logger.error(f"Failed to load session {session_id}: {e}")
+            return cached
+        
+        # The API key is never written to disk, so carry it over from memory
+        if cached is not None:
+            session_data.openai_api_key = cached.openai_api_key
+        
+        self._in_memory_sessions[session_id] = session_data
+        self._session_mtimes[session_id] = mtime
+        return session_data
     
     def update_session(self, session_id: str, **updates) -> bool:
         """Update session data."""
@@ -152,12 +168,18 @@ class SessionManager:
         return len(session.uploaded_videos) >= session.num_clips
     
     def _save_session(self, session_data: SessionData) -> None:
-        """Save session to file (API key is NOT saved for security)."""
+        """Save session to file (API key is NOT saved for security).
+        
+        Writes to a temp file and renames it over the session file, so a crash or a
+        concurrent reader never sees a half-written session.
+        """
         session_file = self.sessions_dir / f"{session_data.session_id}.json"
+        tmp_file = session_file.with_name(f"{session_file.name}.{uuid.uuid4().hex}.tmp")
         try:
             # to_dict() already removes the API key
-            with session_file.open("w", encoding="utf-8") as f:
-                json.dump(session_data.to_dict(), f, indent=2)
+            tmp_file.write_bytes(orjson.dumps(session_data.to_dict()))
+            os.replace(tmp_file, session_file)
+            self._session_mtimes[session_data.session_id] = session_file.stat().st_mtime_ns
         except Exception as e:
             logger.error(f"Failed to save session {session_data.session_id}: {e}")
-
+            tmp_file.unlink(missing_ok=True)
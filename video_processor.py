@@ -1,24 +1,82 @@
 import logging
+import os
 import subprocess
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 logger = logging.getLogger(__name__)
 
 
-def run_ffmpeg(args: List[str]) -> None:
+# -y = overwrite without asking; the rest keeps ffmpeg off stdin and limits stderr to actual errors
+FFMPEG_BASE_ARGS = ["ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error"]
+
+
+def run_ffmpeg(args: List[str], cwd: Optional[Path] = None) -> None:
     """Run an ffmpeg command and raise if it fails."""
-    cmd = ["ffmpeg", "-y"] + args  # -y = overwrite without asking
+    cmd = FFMPEG_BASE_ARGS + args
     logger.debug(f"Running ffmpeg: {' '.join(cmd)}")
     
-    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    # Only stderr is ever looked at, and only decoded when the command failed
+    result = subprocess.run(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
     if result.returncode != 0:
-        logger.error(f"ffmpeg stderr: {result.stderr}")
+        logger.error(f"ffmpeg stderr: {result.stderr.decode('utf-8', 'replace')}")
         raise RuntimeError("ffmpeg command failed")
 
 
+def has_audio(video: Path) -> bool:
+    """Return True if the video has at least one audio stream (or if that can't be determined)."""
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe", "-v", "error",
+                "-select_streams", "a",
+                "-show_entries", "stream=index",
+                "-of", "csv=p=0",
+                str(video),
+            ],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+    except OSError as e:
+        # ffprobe missing or not executable; assume audio so the caller still strips it
+        logger.warning(f"Could not run ffprobe for {video.name}: {e}")
+        return True
+    if result.returncode != 0:
+        # Can't tell; assume audio so the caller still strips it
+        logger.warning(f"ffprobe failed for {video.name}: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return True
+    return bool(result.stdout.strip())
+
+
+def _link_if_silent(input_video: Path, output_video: Path) -> bool:
+    """
+    Hardlink input_video to output_video if it has no audio track.
+    
+    Any existing output_video is removed first, in either case: a silent copy from an
+    earlier run may be a hardlink to the raw clip, and ffmpeg -y would truncate that
+    shared inode, i.e. its own input, when remuxing over it.
+    
+    Returns:
+        True if linked (output_video is then a silent copy), False if the caller must remux
+    """
+    output_video.unlink(missing_ok=True)
+    if has_audio(input_video):
+        return False
+    
+    # Already silent (typical for Sora clips): hardlink instead of remuxing
+    try:
+        os.link(input_video, output_video)
+    except OSError as e:
+        logger.debug(f"Hardlink failed ({e}), remuxing instead")
+        return False
+    logger.info(f"No audio in {input_video.name}, linked as {output_video.name}")
+    return True
+
+
 def strip_audio(input_video: Path, output_video: Path) -> None:
     """Create a silent version of the video (no audio track)."""
+    if _link_if_silent(input_video, output_video):
+        return
+    
     logger.info(f"Stripping audio: {input_video.name} → {output_video.name}")
     run_ffmpeg([
         "-i", str(input_video),
@@ -40,6 +98,53 @@ def extract_last_frame(input_video: Path, output_image: Path) -> None:
     ])
 
 
+def process_clip(input_video: Path, silent_video: Path, last_frame: Path) -> None:
+    """
+    Strip audio and extract the last frame of a clip in a single ffmpeg run.
+    
+    Equivalent to strip_audio() followed by extract_last_frame(), but the clip is
+    opened twice by one process (once from the start for the stream copy, once
+    seeked near the end for the frame) instead of launching ffmpeg twice.
+    Clips without audio are hardlinked as the silent copy, so ffmpeg only
+    extracts the frame.
+    """
+    if _link_if_silent(input_video, silent_video):
+        extract_last_frame(input_video, last_frame)
+        return
+    
+    logger.info(f"Processing clip: {input_video.name} → {silent_video.name}, {last_frame.name}")
+    run_ffmpeg([
+        "-i", str(input_video),
+        "-sseof", "-0.05",  # ~last 0.05 seconds
+        "-i", str(input_video),
+        # Output 1: silent stream copy
+        "-map", "0:v:0",
+        "-c", "copy",
+        "-an",  # remove audio
+        str(silent_video),
+        # Output 2: last frame
+        "-map", "1:v:0",
+        "-frames:v", "1",
+        "-q:v", "2",  # quality
+        str(last_frame),
+    ])
+
+
+def prefetch_files(paths: List[Path]) -> None:
+    """Ask the kernel to start reading files into the page cache (no-op where unsupported)."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logger.debug(f"Could not prefetch {path}: {e}")
+
+
 def concat_videos(video_files: List[Path], output_video: Path) -> None:
     """Concatenate multiple videos into one using ffmpeg concat demuxer."""
     logger.info(f"Concatenating {len(video_files)} videos into {output_video.name}")
@@ -47,21 +152,19 @@ def concat_videos(video_files: List[Path], output_video: Path) -> None:
     list_file = output_video.parent / "list.txt"
     with list_file.open("w", encoding="utf-8") as f:
         for vf in video_files:
-            f.write(f"file '{vf.name}'\n")
+            # Absolute paths, so clips need not live next to the output; escape quotes for the demuxer
+            escaped = str(vf.resolve()).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
 
-    cmd = [
-        "ffmpeg", "-y",
+    # Readahead all clips now so ffmpeg's sequential reads hit a warm page cache
+    prefetch_files(video_files)
+
+    # Stream copy (no re-encode); faststart moves the index to the front so playback starts immediately
+    run_ffmpeg([
         "-f", "concat",
         "-safe", "0",
         "-i", str(list_file.name),
         "-c", "copy",
+        "-movflags", "+faststart",
         str(output_video.name),
-    ]
-    
-    logger.debug(f"Running (from {output_video.parent}): {' '.join(cmd)}")
-    result = subprocess.run(cmd, cwd=output_video.parent, stdout=subprocess.PIPE, 
-                          stderr=subprocess.PIPE, text=True)
-    if result.returncode != 0:
-        logger.error(f"ffmpeg concat stderr: {result.stderr}")
-        raise RuntimeError("ffmpeg concat failed")
-
+    ], cwd=output_video.parent)